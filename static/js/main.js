@@ -27,10 +27,17 @@ function initializeTooltips() {
     });
 }
 
+// Datum som YYYY-MM-DD i lokal tid (toISOString ger UTC, som är föregående dag strax efter midnatt)
+function localDateString(date = new Date()) {
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${date.getFullYear()}-${month}-${day}`;
+}
+
 // Initialisera datum inputs med dagens datum
 function initializeDateInputs() {
     const dateInputs = document.querySelectorAll('input[type="date"]');
-    const today = new Date().toISOString().split('T')[0];
+    const today = localDateString();
     
     dateInputs.forEach(input => {
         if (!input.value) {
@@ -149,6 +156,16 @@ function formatDate(dateString) {
     return date.toLocaleDateString('sv-SE');
 }
 
+// Escapa text (t.ex. namn och beskrivningar) som sätts in i HTML-mallar
+function escapeHtml(value) {
+    return String(value ?? '')
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
 // Validera email
 function validateEmail(email) {
     const re = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
@@ -180,7 +197,7 @@ function showToast(message, type = 'info') {
     toast.innerHTML = `
         <div class="d-flex">
             <div class="toast-body">
-                ${message}
+                ${escapeHtml(message)}
             </div>
             <button type="button" class="btn-close btn-close-white me-2 m-auto" data-bs-dismiss="toast"></button>
         </div>
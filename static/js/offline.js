@@ -0,0 +1,313 @@
+// Offlinestöd för Tidrapporteringssystem
+//
+// Sidorna sparar och tar bort tidrapporter via OfflineQueue. Utan nätverk läggs ändringen i en
+// kö i IndexedDB och skickas till /api/batch_time_entries i omgångar när anslutningen är tillbaka.
+// Varje anrop har en Idempotency-Key, så en ändring som skickas om (t.ex. när svaret gick
+// förlorat) utförs bara en gång på servern. En ändring vars direkta anrop misslyckades skickas
+// därför om till samma endpoint med samma nyckel i stället för att ingå i en omgång.
+
+const OFFLINE_DB_NAME = 'tidrapport-offline';
+const OFFLINE_DB_VERSION = 1;
+const OFFLINE_BATCH_SIZE = 100;
+const OFFLINE_RETRY_MS = 30000;
+
+// Registrera service workern som cachar appens skal och månadsdata
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', function() {
+        navigator.serviceWorker.register('/sw.js').catch(error => {
+            console.warn('Service worker kunde inte registreras:', error);
+        });
+    });
+}
+
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2) + Math.random().toString(36).slice(2);
+}
+
+// Serverns JSON-svar, eller ett fel i samma form om svaret inte är JSON (t.ex. en felsida från en proxy)
+async function readResult(response) {
+    const contentType = response.headers.get('Content-Type') || '';
+    if (contentType.includes('json')) {
+        try {
+            return await response.json();
+        } catch (error) {
+            // Trasig JSON behandlas som övriga svar som inte går att läsa
+        }
+    }
+    return { success: false, error: `Servern svarade ${response.status}` };
+}
+
+// Promise för ett IndexedDB-anrop
+function idbRequest(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function openOfflineDb() {
+    const request = indexedDB.open(OFFLINE_DB_NAME, OFFLINE_DB_VERSION);
+    request.onupgradeneeded = () => {
+        const db = request.result;
+        // Köade ändringar i den ordning de gjordes
+        const queue = db.createObjectStore('queue', { keyPath: 'seq', autoIncrement: true });
+        queue.createIndex('user_id', 'user_id');
+        // Omgångar som skickats (eller ska skickas) med sin Idempotency-Key
+        const batches = db.createObjectStore('batches', { keyPath: 'key' });
+        batches.createIndex('user_id', 'user_id');
+    };
+    return idbRequest(request);
+}
+
+const OfflineQueue = {
+    userId: null,
+    db: null,
+    flushing: null,
+
+    // Starta kön för inloggad användare och skicka det som redan väntar
+    init(userId) {
+        this.userId = userId;
+        if (!window.indexedDB) {
+            return;
+        }
+        window.addEventListener('online', () => this.flush());
+        window.addEventListener('offline', () => this.updateIndicator());
+        setInterval(() => this.flush(), OFFLINE_RETRY_MS);
+        this.flush();
+    },
+
+    database() {
+        if (!this.db) {
+            this.db = openOfflineDb();
+        }
+        return this.db;
+    },
+
+    saveTimeEntry(data) {
+        return this.send('/api/save_time_entry', 'upsert', data);
+    },
+
+    // date är dagen posten gäller, så att sidan kan hämta om dagen när en köad borttagning skickats
+    deleteTimeEntry(entryId, date) {
+        return this.send('/api/delete_time_entry', 'delete', { entry_id: entryId }, date);
+    },
+
+    // Skicka en ändring direkt, eller lägg den i kön om nätverket saknas eller äldre ändringar väntar
+    // (så att ordningen behålls). Svaret är serverns JSON, eller {success, queued, message} för en köad ändring.
+    async send(url, op, payload, date) {
+        const key = newIdempotencyKey();
+        if (this.userId === null || !window.indexedDB) {
+            return this.post(url, payload, key);
+        }
+
+        if (navigator.onLine && await this.pendingCount() === 0) {
+            let response;
+            try {
+                response = await fetch(url, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'Idempotency-Key': key
+                    },
+                    body: JSON.stringify(payload)
+                });
+            } catch (error) {
+                // Nätverksfel: servern kan ha hunnit utföra ändringen, så den köas med samma nyckel
+                // och skickas om till samma endpoint
+                await this.enqueue(op, payload, date, { key: key, url: url });
+                this.flush();
+                return {
+                    success: true,
+                    queued: true,
+                    message: 'Ingen anslutning – ändringen skickas när du är online igen'
+                };
+            }
+            return readResult(response);
+        }
+
+        await this.enqueue(op, payload, date);
+        this.flush();
+        return {
+            success: true,
+            queued: true,
+            message: 'Ingen anslutning – ändringen skickas när du är online igen'
+        };
+    },
+
+    async post(url, payload, key) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Idempotency-Key': key
+            },
+            body: JSON.stringify(payload)
+        });
+        return readResult(response);
+    },
+
+    // sent är { key, url } för en ändring som redan skickats en gång
+    async enqueue(op, payload, date, sent) {
+        const db = await this.database();
+        const tx = db.transaction('queue', 'readwrite');
+        tx.objectStore('queue').add(Object.assign({
+            user_id: this.userId,
+            op: op,
+            payload: payload,
+            date: date || payload.date || null,
+            queued_at: new Date().toISOString()
+        }, sent || {}));
+        await new Promise((resolve, reject) => {
+            tx.oncomplete = resolve;
+            tx.onerror = () => reject(tx.error);
+        });
+        this.updateIndicator();
+    },
+
+    // Antal köade ändringar (även de som ligger i en påbörjad omgång)
+    async pendingCount() {
+        const db = await this.database();
+        const tx = db.transaction(['queue', 'batches'], 'readonly');
+        const queued = await idbRequest(tx.objectStore('queue').index('user_id').count(this.userId));
+        const batches = await idbRequest(tx.objectStore('batches').index('user_id').getAll(this.userId));
+        return queued + batches.reduce((sum, batch) => sum + batch.upserts.length + batch.deletes.length, 0);
+    },
+
+    // Nästa omgång att skicka: en påbörjad omgång skickas om oförändrad med samma nyckel, annars flyttas
+    // de äldsta köade ändringarna till en ny omgång i samma transaktion. En ändring som redan skickats
+    // en gång blir en egen omgång med sin ursprungliga nyckel och endpoint.
+    async nextBatch() {
+        const db = await this.database();
+        const tx = db.transaction(['queue', 'batches'], 'readwrite');
+        const batchStore = tx.objectStore('batches');
+        const queueStore = tx.objectStore('queue');
+
+        const started = await idbRequest(batchStore.index('user_id').getAll(this.userId));
+        if (started.length > 0) {
+            return started[0];
+        }
+
+        const items = await idbRequest(queueStore.index('user_id').getAll(this.userId, OFFLINE_BATCH_SIZE));
+        if (items.length === 0) {
+            return null;
+        }
+
+        // Servern sparar före den tar bort, så en sparning som köats efter en borttagning får vänta till nästa omgång
+        const batch = { key: newIdempotencyKey(), user_id: this.userId, upserts: [], deletes: [], delete_dates: [] };
+        for (const item of items) {
+            if (item.key) {
+                if (batch.upserts.length > 0 || batch.deletes.length > 0) {
+                    break;
+                }
+                batch.key = item.key;
+                batch.url = item.url;
+                batch.payload = item.payload;
+            }
+            if (item.op === 'upsert') {
+                if (batch.deletes.length > 0) {
+                    break;
+                }
+                batch.upserts.push(item.payload);
+            } else {
+                batch.deletes.push(item.payload.entry_id);
+                if (item.date) {
+                    batch.delete_dates.push(item.date);
+                }
+            }
+            queueStore.delete(item.seq);
+            if (item.key) {
+                break;
+            }
+        }
+        batchStore.add(batch);
+
+        await new Promise((resolve, reject) => {
+            tx.oncomplete = resolve;
+            tx.onerror = () => reject(tx.error);
+        });
+        return batch;
+    },
+
+    async removeBatch(key) {
+        const db = await this.database();
+        await idbRequest(db.transaction('batches', 'readwrite').objectStore('batches').delete(key));
+    },
+
+    // Skicka köade ändringar i omgångar tills kön är tom eller nätverket försvinner
+    flush() {
+        if (this.userId === null || !window.indexedDB) {
+            return Promise.resolve();
+        }
+        if (!this.flushing) {
+            this.flushing = this.flushBatches()
+                .catch(error => console.warn('Kunde inte skicka köade ändringar:', error))
+                .finally(() => {
+                    this.flushing = null;
+                    this.updateIndicator();
+                });
+        }
+        return this.flushing;
+    },
+
+    async flushBatches() {
+        while (navigator.onLine) {
+            const batch = await this.nextBatch();
+            if (!batch) {
+                return;
+            }
+
+            let response;
+            try {
+                response = await fetch(batch.url || '/api/batch_time_entries', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'Idempotency-Key': batch.key
+                    },
+                    body: JSON.stringify(batch.url ? batch.payload : { upserts: batch.upserts, deletes: batch.deletes })
+                });
+            } catch (error) {
+                return;  // Fortfarande offline, omgången skickas om senare
+            }
+
+            // Utloggad (omdirigering till inloggningen) eller serverfel: försök igen senare
+            if (response.redirected || response.status >= 500) {
+                return;
+            }
+
+            // Övriga svar tar bort omgången, även 4xx som aldrig kommer att lyckas (annars stoppar
+            // den kön för alltid). Ett svar som inte är JSON redovisas som ett fel.
+            let result = await readResult(response);
+            if (!response.ok && result.success !== false) {
+                result = { success: false, error: `Servern svarade ${response.status}` };
+            }
+            await this.removeBatch(batch.key);
+
+            // Sidan uppdaterar kalendern; poster och omgångar som servern avvisat redovisas i result
+            window.dispatchEvent(new CustomEvent('offlinequeue:synced', {
+                detail: { batch: batch, result: result }
+            }));
+        }
+    },
+
+    // Visa i menyraden om appen är offline eller har ändringar som väntar
+    async updateIndicator() {
+        const indicator = document.getElementById('offline-status');
+        if (!indicator) {
+            return;
+        }
+
+        const pending = this.userId !== null && window.indexedDB ? await this.pendingCount() : 0;
+        if (!navigator.onLine) {
+            indicator.textContent = pending > 0 ? `Offline – ${pending} ändringar väntar` : 'Offline';
+        } else if (pending > 0) {
+            indicator.textContent = `${pending} ändringar väntar`;
+        } else {
+            indicator.textContent = '';
+        }
+        indicator.classList.toggle('d-none', indicator.textContent === '');
+    }
+};
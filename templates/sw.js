@@ -0,0 +1,114 @@
+// Service worker för Tidrapporteringssystem: appens skal och månadsdata cachas så att
+// kalendern fungerar utan nätverk. Skrivningar köas av sidan (static/js/offline.js).
+
+const VERSION = {{ version|tojson }};
+const SHELL_CACHE = `tidrapport-shell-${VERSION}`;
+const DATA_CACHE = 'tidrapport-data';
+
+// Statiska filer (med innehållshash) och CDN-filer som alla sidor behöver
+const SHELL_URLS = {{ shell_urls|tojson }};
+
+// CDN-filer som hämtas av skalets CSS (t.ex. Font Awesomes typsnitt) cachas när de först används
+const CDN_HOSTS = SHELL_URLS.filter(url => url.startsWith('https://')).map(url => new URL(url).host);
+
+// Sidor och GET-anrop med månadsdata som visas från cachen när nätverket saknas. Inget annat sparas
+// på enheten (t.ex. exporter och adminsidor).
+const PAGE_PATHS = ['/dashboard', '/calendar'];
+const DATA_PATHS = ['/api/calendar_data', '/api/calendar_range', '/get_day_entries'];
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            // En fil som inte går att hämta (t.ex. blockerat CDN) ska inte stoppa installationen
+            .then(cache => Promise.all(SHELL_URLS.map(url =>
+                cache.add(url).catch(error => console.warn('Kunde inte cacha', url, error))
+            )))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    // Ta bort skal från tidigare versioner
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key.startsWith('tidrapport-shell-') && key !== SHELL_CACHE)
+                    .map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    const url = new URL(request.url);
+
+    // Utloggning: sidor och data för användaren ska inte ligga kvar på enheten
+    if (url.origin === self.location.origin && url.pathname === '/logout') {
+        event.respondWith(caches.delete(DATA_CACHE).then(() => fetch(request)));
+        return;
+    }
+
+    if (SHELL_URLS.includes(request.url) || SHELL_URLS.includes(url.pathname + url.search) || CDN_HOSTS.includes(url.host)) {
+        event.respondWith(cacheFirst(request));
+    } else if (url.origin === self.location.origin && PAGE_PATHS.includes(url.pathname) && request.mode === 'navigate') {
+        event.respondWith(networkFirst(request, ['text/html']));
+    } else if (url.origin === self.location.origin && DATA_PATHS.includes(url.pathname)) {
+        event.respondWith(networkFirst(request, ['application/json', {{ compact_json_mimetype|tojson }}]));
+    }
+});
+
+// Filer med innehållshash och versionerade CDN-filer ändras aldrig, så cachen räcker
+function cacheFirst(request) {
+    return caches.match(request).then(cached => cached || fetch(request).then(response => {
+        if (response.ok || response.type === 'opaque') {
+            const copy = response.clone();
+            caches.open(SHELL_CACHE).then(cache => cache.put(request, copy));
+        }
+        return response;
+    }));
+}
+
+// Bara svar av förväntad typ som visas i webbläsaren sparas, inte nedladdningar
+function cacheable(response, contentTypes) {
+    const contentType = response.headers.get('Content-Type') || '';
+    const disposition = response.headers.get('Content-Disposition') || '';
+    return response.ok && !response.redirected
+        && contentTypes.some(type => contentType.startsWith(type))
+        && !disposition.toLowerCase().startsWith('attachment');
+}
+
+// Senaste svaret från servern sparas; utan nätverk används den sparade kopian
+function networkFirst(request, contentTypes) {
+    return fetch(request)
+        .then(response => {
+            if (cacheable(response, contentTypes)) {
+                const copy = response.clone();
+                caches.open(DATA_CACHE).then(cache => cache.put(request, copy));
+            }
+            return response;
+        })
+        .catch(error => caches.open(DATA_CACHE)
+            .then(cache => cache.match(request, { ignoreVary: true })
+                // Sidor för en annan månad än den som sparats: visa sidan utan query-parametrar
+                .then(cached => cached || (request.mode === 'navigate'
+                    ? cache.match(request, { ignoreSearch: true, ignoreVary: true })
+                    : undefined)))
+            .then(cached => {
+                if (cached) {
+                    return cached;
+                }
+                if (request.mode === 'navigate') {
+                    return new Response(
+                        '<!DOCTYPE html><html lang="sv"><meta charset="UTF-8"><title>Offline</title>' +
+                        '<body><p>Ingen anslutning och sidan finns inte sparad på enheten.</p></body></html>',
+                        { status: 503, headers: { 'Content-Type': 'text/html; charset=utf-8' } }
+                    );
+                }
+                throw error;
+            }));
+}
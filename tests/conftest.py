@@ -0,0 +1,55 @@
+"""
+Gemensamma fixturer: appen mot en tillfällig SQLite-databas med en inloggad användare.
+
+Appen läser DATABASE_URL när modulen importeras, så databasen skapas här en gång för alla tester.
+Testerna använder olika månader så att de inte påverkar varandras tidrapporter.
+"""
+
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+PASSWORD = 'test123'
+
+
+@pytest.fixture(scope='session')
+def tidapp(tmp_path_factory):
+    """Appen med en användare, två klienter och två projekt per klient"""
+    from werkzeug.security import generate_password_hash
+
+    db_path = tmp_path_factory.mktemp('db') / 'tidrapport.db'
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['EXPORT_DIR'] = str(tmp_path_factory.mktemp('exports'))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import app as tidapp
+
+    with tidapp.app.app_context():
+        db = tidapp.db
+        tidapp.upgrade_schema()
+        now = datetime.utcnow()
+        db.session.execute(tidapp.User.__table__.insert(), [{
+            'name': 'Testkonsult', 'email': 'test@example.se', 'is_admin': True, 'created_at': now,
+            'password_hash': generate_password_hash(PASSWORD, 'pbkdf2:sha256:1000')
+        }])
+        db.session.execute(tidapp.Client.__table__.insert(), [
+            {'name': f'Klient {c}', 'description': '', 'active': True, 'created_at': now}
+            for c in (1, 2)
+        ])
+        db.session.execute(tidapp.Project.__table__.insert(), [
+            {'name': f'Projekt {c}.{p}', 'description': '', 'client_id': c, 'active': True,
+             'hourly_rate': 1000.0, 'created_at': now}
+            for c in (1, 2) for p in (1, 2)
+        ])
+        db.session.commit()
+    return tidapp
+
+
+@pytest.fixture(scope='session')
+def client(tidapp):
+    """Testklient inloggad som testanvändaren (admin)"""
+    client = tidapp.app.test_client()
+    response = client.post('/login', data={'email': 'test@example.se', 'password': PASSWORD})
+    assert response.status_code == 302
+    return client
@@ -0,0 +1,42 @@
+"""
+HTTP-cachning: villkorliga GET med ETag, komprimering och statiska filer med innehållshash.
+"""
+
+import gzip
+
+
+def test_calendar_data_not_modified_until_entries_change(client):
+    url = '/api/calendar_data?year=2021&month=3'
+    first = client.get(url)
+    etag = first.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    client.post('/api/save_time_entry', json={'date': '2021-03-05', 'client_id': 1, 'hours': 1})
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_json_and_html_are_compressed(client):
+    response = client.get('/dashboard', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert b'<html' in gzip.decompress(response.get_data())
+
+
+def test_fingerprinted_static_files_are_cached_and_compressed(tidapp, client):
+    with tidapp.app.test_request_context():
+        url = tidapp.url_for('static', filename='css/style.css')
+    assert '?v=' in url
+
+    with open(f'{tidapp.app.static_folder}/css/style.css', 'rb') as f:
+        content = f.read()
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == content
+
+    plain = client.get(url)
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.get_data() == content
@@ -0,0 +1,55 @@
+"""
+CSV-import av tidrapporter: räkning av importerade och avvisade rader samt månadssummeringen.
+
+Importen använder månader 2019 så att den inte påverkar de andra testernas tidrapporter.
+"""
+
+import io
+from datetime import date
+
+from test_time_entries import assert_rollup_matches, entries_on
+
+HEADER = 'Datum,Klient,Projekt,Timmar,Beskrivning,Skapad\n'
+
+
+def post_import(client, text):
+    data = {'file': (io.BytesIO(text.encode('utf-8')), 'import.csv')}
+    return client.post('/api/import_time_entries', data=data, content_type='multipart/form-data')
+
+
+def test_import_counts_entries_not_merged_rows(tidapp, client):
+    response = post_import(client, HEADER + (
+        '2019-01-10,Klient 1,Projekt 1.1,2,Första,\n'
+        '2019-01-10,klient 1,projekt 1.1,"3,5",Sista,\n'
+        '2019-01-11,Klient 2,Inget projekt,1,,2019-01-11 08:00:00\n'
+        '2019-01-12,Okänd,,1,,\n'
+        '2019-01-12,Klient 1,,25,,\n'
+    ))
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['imported'] == 2
+    assert result['rejected'] == 2
+    assert not result['success']
+    assert [r['line'] for r in result['rejections']] == [5, 6]
+
+    assert entries_on(tidapp, date(2019, 1, 10)) == [(1, 1, 3.5, 'Sista')]
+    assert entries_on(tidapp, date(2019, 1, 11)) == [(2, None, 1.0, 'Arbete för Klient 2')]
+    assert_rollup_matches(tidapp)
+
+
+def test_import_counts_each_batch(tidapp):
+    lines = io.StringIO(HEADER + ''.join(
+        f'2019-02-{day:02d},Klient 1,,1,Dag {day},\n' for day in (1, 1, 2, 3, 4)
+    ))
+    rejects = []
+    with tidapp.app.app_context():
+        imported, rejected = tidapp.import_time_entries(1, lines, lambda *args: rejects.append(args), batch_size=2)
+    assert (imported, rejected, rejects) == (4, 0, [])
+    assert entries_on(tidapp, date(2019, 2, 1)) == [(1, None, 1.0, 'Dag 1')]
+    assert_rollup_matches(tidapp)
+
+
+def test_import_requires_header(client):
+    response = post_import(client, '2019-03-01,Klient 1,,1,,\n')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
@@ -0,0 +1,102 @@
+"""
+Antal SQL-satser per anrop för sidorna som visar tidrapporter.
+
+Tidrapporterna ska läsas med klient- och projektnamn i en och samma fråga, så antalet satser
+får inte växa med antalet poster. Varje rutt mäts för en månad med få poster och en med många.
+
+Körs med:
+    python -m pytest tests
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+
+def months_ago(count):
+    """(år, månad) count månader före innevarande månad"""
+    today = date.today()
+    index = today.year * 12 + today.month - 1 - count
+    return index // 12, index % 12 + 1
+
+
+# Månad utan tidrapporter (för att fylla cacharna) och med få respektive många. Dashboarden visar
+# inga framtida månader och inget före 2025, så månaderna räknas bakåt från idag.
+EMPTY_MONTH = months_ago(3)
+SMALL_MONTH = months_ago(2)
+LARGE_MONTH = months_ago(1)
+
+MONTH_NAMES = [
+    '', 'Januari', 'Februari', 'Mars', 'April', 'Maj', 'Juni',
+    'Juli', 'Augusti', 'September', 'Oktober', 'November', 'December'
+]
+
+# Högsta tillåtna antal SQL-satser per anrop (inloggad användare och referensdata är cachade)
+ROUTES = {
+    'dashboard': ('/dashboard?year={year}&month={month}', 2),
+    'calendar_data': ('/api/calendar_data?year={year}&month={month}', 2),
+    'get_day_entries': ('/get_day_entries?date={year}-{month:02d}-{day:02d}', 2),
+    'export_csv': ('/export_csv?date_from={year}-{month:02d}-01&date_to={year}-{month:02d}-28', 1),
+}
+
+
+@pytest.fixture(scope='module', autouse=True)
+def month_entries(tidapp):
+    """En tidrapport i SMALL_MONTH, en per dag, klient och projekt i LARGE_MONTH"""
+    with tidapp.app.app_context():
+        db = tidapp.db
+        now = datetime.utcnow()
+        entries = [(date(*SMALL_MONTH, 1), 1, 1)]
+        entries += [
+            (date(*LARGE_MONTH, day), client_id, (client_id - 1) * 2 + p)
+            for day in range(1, 29) for client_id in (1, 2) for p in (1, 2)
+        ]
+        db.session.execute(tidapp.TimeEntry.__table__.insert(), [
+            {'user_id': 1, 'date': entry_date, 'client_id': client_id, 'project_id': project_id,
+             'hours': 2.0, 'description': f'Post {i}', 'hourly_rate': 1000.0,
+             'created_at': now, 'updated_at': now}
+            for i, (entry_date, client_id, project_id) in enumerate(entries)
+        ])
+        db.session.commit()
+        tidapp.rebuild_monthly_hours()
+
+
+def fetch_counting_statements(tidapp, client, url):
+    """Hämta url och returnera (antal SQL-satser, svarets innehåll), även för strömmade svar"""
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with tidapp.app.app_context():
+        engine = tidapp.db.engine
+    event.listen(engine, 'after_cursor_execute', record)
+    try:
+        response = client.get(url)
+        body = response.get_data(as_text=True)
+    finally:
+        event.remove(engine, 'after_cursor_execute', record)
+    assert response.status_code == 200, url
+    return len(statements), body
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_statements_per_request_do_not_grow_with_entries(tidapp, client, route):
+    url, budget = ROUTES[route]
+    bodies = []
+    counts = []
+    # Första anropet fyller cacharna för användaren och referensdata, men inte månadens sidfragment
+    for year, month in (EMPTY_MONTH, SMALL_MONTH, LARGE_MONTH):
+        count, body = fetch_counting_statements(tidapp, client, url.format(year=year, month=month, day=1))
+        counts.append(count)
+        bodies.append(body)
+        if route == 'dashboard':
+            assert f'{MONTH_NAMES[month]} {year}</span>' in body
+
+    # Varje anrop visar sin egen månad, inte en tidigare från cachen
+    assert len(set(bodies)) == 3, f'{route}: samma innehåll för olika månader'
+    small, large = counts[1:]
+    assert large == small, f'{route}: {small} satser för en post men {large} för en hel månad'
+    assert large <= budget, f'{route}: {large} SQL-satser, högst {budget} tillåtna'
@@ -0,0 +1,168 @@
+"""
+Skrivvägarna för tidrapporter: upsert, batch och Idempotency-Key.
+
+Varje test använder en egen månad 2020 så att testerna inte påverkar varandra. Efter varje
+skrivning ska månadssummeringen stämma med tidrapporterna (check_monthly_hours).
+"""
+
+import uuid
+from datetime import date
+
+
+def entries_on(tidapp, day):
+    """(klient, projekt, timmar, beskrivning) för testanvändarens tidrapporter en dag"""
+    with tidapp.app.app_context():
+        return sorted((
+            (entry.client_id, entry.project_id, entry.hours, entry.description)
+            for entry in tidapp.TimeEntry.query.filter_by(user_id=1, date=day)
+        ), key=lambda entry: (entry[0], entry[1] or 0))
+
+
+def assert_rollup_matches(tidapp):
+    with tidapp.app.app_context():
+        assert tidapp.check_monthly_hours() == []
+
+
+def rollup_rows(tidapp, year_month):
+    with tidapp.app.app_context():
+        return tidapp.MonthlyHours.query.filter_by(user_id=1, year_month=year_month).count()
+
+
+def save(client, **entry):
+    return client.post('/api/save_time_entry', json=entry).get_json()
+
+
+def test_save_updates_existing_entry_for_same_key(tidapp, client):
+    for hours in (2, 3):
+        assert save(client, date='2020-01-10', client_id=1, project_id=1, hours=hours, description='Möte')['success']
+        assert save(client, date='2020-01-10', client_id=1, project_id=None, hours=hours, description='Utan projekt')['success']
+
+    assert entries_on(tidapp, date(2020, 1, 10)) == [(1, None, 3.0, 'Utan projekt'), (1, 1, 3.0, 'Möte')]
+    assert rollup_rows(tidapp, '2020-01') == 2
+    assert_rollup_matches(tidapp)
+
+
+def test_save_rejects_invalid_hours(tidapp, client):
+    result = save(client, date='2020-02-10', client_id=1, hours=25)
+    assert not result['success']
+    assert entries_on(tidapp, date(2020, 2, 10)) == []
+
+
+def test_delete_removes_entry_and_rollup(tidapp, client):
+    save(client, date='2020-03-10', client_id=2, project_id=3, hours=4, description='Bort')
+    day = client.get('/get_day_entries?date=2020-03-10').get_json()
+    entry_id = day['entries'][0]['id']
+
+    result = client.post('/api/delete_time_entry', json={'entry_id': entry_id}).get_json()
+    assert result['success']
+    assert entries_on(tidapp, date(2020, 3, 10)) == []
+    assert rollup_rows(tidapp, '2020-03') == 0
+    assert_rollup_matches(tidapp)
+
+
+def test_batch_upserts_last_value_wins_and_reports_ids(tidapp, client):
+    existing = save(client, date='2020-04-01', client_id=1, project_id=2, hours=1, description='Före')
+    assert existing['success']
+
+    response = client.post('/api/batch_time_entries', json={'upserts': [
+        {'date': '2020-04-01', 'client_id': 1, 'project_id': 2, 'hours': 5, 'description': 'Uppdaterad'},
+        {'date': '2020-04-02', 'client_id': 1, 'hours': 2, 'description': 'Första'},
+        {'date': '2020-04-02', 'client_id': 1, 'hours': 6, 'description': 'Sista'},
+    ]})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['success']
+    upserts = result['upserts']
+    assert [r['index'] for r in upserts] == [0, 1, 2]
+    assert [r['created'] for r in upserts] == [False, True, True]
+    assert upserts[1]['id'] == upserts[2]['id']
+
+    assert entries_on(tidapp, date(2020, 4, 1)) == [(1, 2, 5.0, 'Uppdaterad')]
+    assert entries_on(tidapp, date(2020, 4, 2)) == [(1, None, 6.0, 'Sista')]
+    assert_rollup_matches(tidapp)
+
+
+def test_batch_validates_each_item(tidapp, client):
+    response = client.post('/api/batch_time_entries', json={'upserts': [
+        'inte ett objekt',
+        {'date': '2020-05-01', 'client_id': 999, 'hours': 1},
+        {'date': '2020-05-01', 'client_id': 1, 'project_id': 3, 'hours': 1},
+        {'date': 'igår', 'client_id': 1, 'hours': 1},
+        {'date': '2020-05-01', 'client_id': 1, 'project_id': 1, 'hours': 1},
+    ]})
+    result = response.get_json()
+    assert response.status_code == 200
+    assert not result['success']
+    assert [r['success'] for r in result['upserts']] == [False, False, False, False, True]
+    assert entries_on(tidapp, date(2020, 5, 1)) == [(1, 1, 1.0, 'Arbete för Klient 1')]
+
+
+def test_batch_rejects_non_object_body(client):
+    for body in (['a'], 'text', 5):
+        response = client.post('/api/batch_time_entries', json=body)
+        assert response.status_code == 400
+        assert response.get_json()['success'] is False
+
+    response = client.post('/api/batch_time_entries', json={'upserts': {}, 'deletes': []})
+    assert response.status_code == 400
+
+
+def test_batch_delete_results_follow_input_order(tidapp, client):
+    created = client.post('/api/batch_time_entries', json={'upserts': [
+        {'date': '2020-06-01', 'client_id': 1, 'hours': 1},
+        {'date': '2020-06-02', 'client_id': 1, 'hours': 1},
+    ]}).get_json()
+    first, second = (r['id'] for r in created['upserts'])
+
+    result = client.post('/api/batch_time_entries', json={
+        'deletes': [first, 'abc', 99999999, str(second), first]
+    }).get_json()
+    deletes = result['deletes']
+    assert [r['index'] for r in deletes] == [0, 1, 2, 3, 4]
+    assert [r['success'] for r in deletes] == [True, False, False, True, False]
+    assert deletes[1]['error'] == 'Ogiltigt id'
+    assert entries_on(tidapp, date(2020, 6, 1)) == []
+    assert entries_on(tidapp, date(2020, 6, 2)) == []
+    assert rollup_rows(tidapp, '2020-06') == 0
+    assert_rollup_matches(tidapp)
+
+
+def test_idempotency_key_replays_stored_response(tidapp, client):
+    key = str(uuid.uuid4())
+    payload = {'upserts': [{'date': '2020-07-01', 'client_id': 2, 'hours': 3}]}
+    first = client.post('/api/batch_time_entries', json=payload, headers={'Idempotency-Key': key})
+    assert first.status_code == 200
+    assert 'Idempotent-Replayed' not in first.headers
+
+    # Posten tas bort; en upprepning med samma nyckel får det sparade svaret och skriver inget
+    entry_id = first.get_json()['upserts'][0]['id']
+    client.post('/api/delete_time_entry', json={'entry_id': entry_id})
+    replay = client.post('/api/batch_time_entries', json=payload, headers={'Idempotency-Key': key})
+    assert replay.status_code == 200
+    assert replay.headers['Idempotent-Replayed'] == 'true'
+    assert replay.get_json() == first.get_json()
+    assert entries_on(tidapp, date(2020, 7, 1)) == []
+
+
+def test_idempotent_delete_replays_success(tidapp, client):
+    save(client, date='2020-08-01', client_id=1, hours=2)
+    entry_id = client.get('/get_day_entries?date=2020-08-01').get_json()['entries'][0]['id']
+    key = str(uuid.uuid4())
+
+    # Svaret gick förlorat och borttagningen skickas om: samma svar, inte "hittades inte"
+    for _ in range(2):
+        result = client.post('/api/delete_time_entry', json={'entry_id': entry_id},
+                             headers={'Idempotency-Key': key}).get_json()
+        assert result == {'success': True, 'message': 'Tidrapport borttagen'}
+
+
+def test_idempotency_key_reused_on_other_endpoint(client):
+    key = str(uuid.uuid4())
+    client.post('/api/save_time_entry', json={'date': '2020-09-01', 'client_id': 1, 'hours': 1},
+                headers={'Idempotency-Key': key})
+    response = client.post('/api/delete_time_entry', json={'entry_id': 1}, headers={'Idempotency-Key': key})
+    assert response.status_code == 422
+
+    response = client.post('/api/save_time_entry', json={'date': '2020-09-01', 'client_id': 1, 'hours': 1},
+                           headers={'Idempotency-Key': 'x' * 101})
+    assert response.status_code == 400